@@ -149,6 +149,9 @@ class BoptestGymEnv(gym.Env):
         self.render_episodes    = render_episodes
         self.log_dir            = log_dir
         
+        # Reuse the same connection for all requests to the BOPTEST server
+        self.session            = requests.Session()
+        
         # Avoid requesting data before the beginning of the year
         if self.regressive_period is not None:
             self.bgn_year_margin = self.regressive_period
@@ -161,19 +164,19 @@ class BoptestGymEnv(gym.Env):
         # Get test information
         #=============================================================
         # Test case name
-        self.name = requests.get('{0}/name'.format(url)).json()
+        self.name = self.session.get('{0}/name'.format(url)).json()
         # Measurements available
-        self.all_measurement_vars = requests.get('{0}/measurements'.format(url)).json()
+        self.all_measurement_vars = self.session.get('{0}/measurements'.format(url)).json()
         # Predictive variables available
-        self.all_predictive_vars = requests.get('{0}/forecast'.format(url)).json()
+        self.all_predictive_vars = self.session.get('{0}/forecast'.format(url)).json()
         # Inputs available
-        self.all_input_vars = requests.get('{0}/inputs'.format(url)).json()
+        self.all_input_vars = self.session.get('{0}/inputs'.format(url)).json()
         # Default simulation step
-        self.step_def = requests.get('{0}/step'.format(url)).json()
+        self.step_def = self.session.get('{0}/step'.format(url)).json()
         # Default forecast parameters
-        self.forecast_def = requests.get('{0}/forecast_parameters'.format(url)).json()
+        self.forecast_def = self.session.get('{0}/forecast_parameters'.format(url)).json()
         # Default scenario
-        self.scenario_def = requests.get('{0}/scenario'.format(url)).json()
+        self.scenario_def = self.session.get('{0}/scenario'.format(url)).json()
         
         #=============================================================
         # Define observation space
@@ -460,21 +463,21 @@ class BoptestGymEnv(gym.Env):
             self.start_time = find_start_time()
         
         # Initialize the building simulation
-        res = requests.put('{0}/initialize'.format(self.url), 
-                           data={'start_time':self.start_time,
-                                 'warmup_period':self.warmup_period}).json()
+        res = self.session.put('{0}/initialize'.format(self.url), 
+                               data={'start_time':self.start_time,
+                                     'warmup_period':self.warmup_period}).json()
         
         # Set simulation step
-        requests.put('{0}/step'.format(self.url), data={'step':self.step_period})
+        self.session.put('{0}/step'.format(self.url), data={'step':self.step_period})
         
         # Set BOPTEST scenario
-        requests.put('{0}/scenario'.format(self.url), data=self.scenario)
+        self.session.put('{0}/scenario'.format(self.url), data=self.scenario)
         
         # Set forecasting parameters if predictive
         if self.is_predictive:
             forecast_parameters = {'horizon':self.predictive_period, 'interval':self.step_period}
-            requests.put('{0}/forecast_parameters'.format(self.url),
-                         data=forecast_parameters)
+            self.session.put('{0}/forecast_parameters'.format(self.url),
+                             data=forecast_parameters)
         
         # Initialize objective integrand
         self.objective_integrand = 0.
@@ -521,7 +524,7 @@ class BoptestGymEnv(gym.Env):
             u[act.replace('_u','_activate')] = 1.
                 
         # Advance a BOPTEST simulation
-        res = requests.post('{0}/advance'.format(self.url), data=u).json()
+        res = self.session.post('{0}/advance'.format(self.url), data=u).json()
         
         # Compute reward of this (state-action-state') tuple
         reward = self.compute_reward()
@@ -561,7 +564,7 @@ class BoptestGymEnv(gym.Env):
             plot_results(self, self.episode_rewards, log_dir=self.log_dir)
 
     def close(self):
-        pass
+        self.session.close()
     
     def compute_reward(self):
         '''
@@ -593,7 +596,7 @@ class BoptestGymEnv(gym.Env):
         w = 1
         
         # Compute BOPTEST core kpis
-        kpis = requests.get('{0}/kpi'.format(self.url)).json()
+        kpis = self.session.get('{0}/kpi'.format(self.url)).json()
         
         # Calculate objective integrand function at this point
         objective_integrand = kpis['cost_tot'] + w*kpis['tdis_tot']
@@ -667,10 +670,10 @@ class BoptestGymEnv(gym.Env):
         if self.is_regressive:
             regr_index = res['time']-self.step_period*np.arange(1,self.regr_n+1)
             for var in self.regressive_vars:
-                res_var = requests.put('{0}/results'.format(self.url), 
-                                       data={'point_name':var,
-                                             'start_time':regr_index[-1], 
-                                             'final_time':regr_index[0]}).json()
+                res_var = self.session.put('{0}/results'.format(self.url), 
+                                           data={'point_name':var,
+                                                 'start_time':regr_index[-1], 
+                                                 'final_time':regr_index[0]}).json()
                 # fill_value='extrapolate' is needed for the very few cases when
                 # res_var['time'] is not returned to be exactly between 
                 # regr_index[-1] and regr_index[0] but shorter. In these cases
@@ -683,7 +686,7 @@ class BoptestGymEnv(gym.Env):
 
         # Get predictions if this is a predictive agent
         if self.is_predictive:
-            predictions = requests.get('{0}/forecast'.format(self.url)).json()
+            predictions = self.session.get('{0}/forecast'.format(self.url)).json()
             for var in self.predictive_vars:
                 for i in range(self.pred_n):
                     observations.append(predictions[var][i])
@@ -701,7 +704,7 @@ class BoptestGymEnv(gym.Env):
         '''
         
         # Compute BOPTEST core kpis
-        kpis = requests.get('{0}/kpi'.format(self.url)).json()
+        kpis = self.session.get('{0}/kpi'.format(self.url)).json()
         
         return kpis
     
@@ -1113,7 +1116,7 @@ class BoptestGymEnvRewardClipping(BoptestGymEnv):
         '''
         
         # Compute BOPTEST core kpis
-        kpis = requests.get('{0}/kpi'.format(self.url)).json()
+        kpis = self.session.get('{0}/kpi'.format(self.url)).json()
         
         # Calculate objective integrand function at this point
         objective_integrand = kpis['cost_tot'] + kpis['tdis_tot']
@@ -1150,7 +1153,7 @@ class BoptestGymEnvRewardWeightCost(BoptestGymEnv):
         w = 0.1
         
         # Compute BOPTEST core kpis
-        kpis = requests.get('{0}/kpi'.format(self.url)).json()
+        kpis = self.session.get('{0}/kpi'.format(self.url)).json()
         
         # Calculate objective integrand function at this point
         objective_integrand = kpis['cost_tot'] + w*kpis['tdis_tot']
@@ -1184,7 +1187,7 @@ class BoptestGymEnvRewardWeightDiscomfort(BoptestGymEnv):
         w = 10
         
         # Compute BOPTEST core kpis
-        kpis = requests.get('{0}/kpi'.format(self.url)).json()
+        kpis = self.session.get('{0}/kpi'.format(self.url)).json()
         
         # Calculate objective integrand function at this point
         objective_integrand = kpis['cost_tot'] + w*kpis['tdis_tot']
@@ -6,12 +6,12 @@ The BOPTEST bestest_hydrinic_heat_pump case needs to be deployed.
 
 '''
 import numpy as np
-import requests
 import random
+import os
 from boptestGymEnv import BoptestGymEnv, NormalizedObservationWrapper, NormalizedActionWrapper
 from examples.test_and_plot import test_agent
 
-url = 'http://127.0.0.1:5000'
+url = os.environ.get('BOPTEST_URL', 'http://127.0.0.1:5000')
 
 # Seed for random starting times of episodes
 random.seed(123456)
@@ -73,14 +73,12 @@ def run_reward_custom(plot=False):
             
             '''
             
-            # Define relative weight for discomfort 
-            w = 0.1
-            
             # Compute BOPTEST core kpis
-            kpis = requests.get('{0}/kpi'.format(self.url)).json()
+            kpis = self.get_kpis()
             
-            # Calculate objective integrand function at this point
-            objective_integrand = kpis['cost_tot'] + w*kpis['tdis_tot']
+            # Calculate objective integrand function at this point with
+            # a relative weight for discomfort of 0.1
+            objective_integrand = compute_objective_integrand(kpis, w=0.1)
             
             # Compute reward
             reward = -(objective_integrand - self.objective_integrand)
@@ -125,10 +123,10 @@ def run_reward_clipping(plot=False):
             '''
             
             # Compute BOPTEST core kpis
-            kpis = requests.get('{0}/kpi'.format(self.url)).json()
+            kpis = self.get_kpis()
             
             # Calculate objective integrand function at this point
-            objective_integrand = kpis['cost_tot'] + kpis['tdis_tot']
+            objective_integrand = compute_objective_integrand(kpis)
             
             # Compute reward
             reward = -(objective_integrand - self.objective_integrand)
@@ -222,8 +220,147 @@ def run_highly_dynamic_price(plot=False):
          
     return observations, actions, rewards
     
-def run(envClass, wrapper=None, scenario={'electricity_price':'constant'}, 
-        plot=False):
+def run_baseline_trajectory(plot=False):
+    '''Run the baseline controller once and store the BOPTEST core KPIs
+    at the end of every step. Since the baseline controller does not 
+    depend on the reward, different reward functions and observation 
+    wrappers can be evaluated afterwards from this same trajectory using
+    `compute_rewards` and `normalize_observations`. 
+    
+    Parameters
+    ----------
+    plot : bool, optional
+        True to plot timeseries results.
+        Default is False.
+    
+    Returns
+    -------
+    observations : list
+        Observations obtained in simulation
+    rewards : list
+        Rewards obtained in simulation with the default reward function
+    kpis : list
+        BOPTEST core KPIs obtained at the end of each step
+    env : BoptestGymEnv
+        Environment used for the simulation
+    
+    '''
+    
+    kpis = []
+    
+    # Define a parent class as a wrapper to store the kpis of every step
+    class BoptestGymEnvKpis(BoptestGymEnv):
+        
+        def compute_reward(self):
+            '''Store the BOPTEST core kpis at the end of this step and
+            compute the default reward from these same kpis. 
+            
+            '''
+            
+            # Compute BOPTEST core kpis
+            kpis_step = self.get_kpis()
+            kpis.append(kpis_step)
+            
+            # Calculate objective integrand function at this point
+            objective_integrand = compute_objective_integrand(kpis_step)
+            
+            # Compute reward
+            reward = -(objective_integrand - self.objective_integrand)
+            
+            self.objective_integrand = objective_integrand
+            
+            return reward
+    
+    env = make_env(envClass=BoptestGymEnvKpis)
+    model = BaselineModel()
+    # Perform test
+    observations, _, rewards, _ = test_agent(env, model, 
+                         start_time=start_time_test, 
+                         episode_length=episode_length_test,
+                         warmup_period=warmup_period_test,
+                         plot=plot)
+    
+    return observations, rewards, kpis, env
+
+def compute_objective_integrand(kpis, w=1.):
+    '''Compute the objective integrand function as the sum of the total 
+    operational cost plus the weighted discomfort. 
+    
+    Parameters
+    ----------
+    kpis : dict
+        BOPTEST core KPIs
+    w : float, optional
+        Relative weight for the discomfort.
+        Default is 1.
+    
+    Returns
+    -------
+    objective_integrand : float
+        Objective integrand function
+    
+    '''
+    
+    return kpis['cost_tot'] + w*kpis['tdis_tot']
+
+def compute_rewards(kpis, w=1., clip=False):
+    '''Compute the rewards of a trajectory from the BOPTEST core KPIs 
+    at the end of each step. The reward is the negated increase in the 
+    objective integrand function, as done in `BoptestGymEnv.compute_reward`.
+    
+    Parameters
+    ----------
+    kpis : list
+        BOPTEST core KPIs obtained at the end of each step
+    w : float, optional
+        Relative weight for the discomfort.
+        Default is 1.
+    clip : bool, optional
+        True to filter rewards to be either -1 or 0. 
+        Default is False.
+    
+    Returns
+    -------
+    rewards : list
+        Rewards obtained in simulation
+    
+    '''
+    
+    # Calculate objective integrand function at each step, which is 
+    # initialized to zero when the environment is reset
+    objective_integrand = np.array([compute_objective_integrand(k, w=w) for k in kpis])
+    
+    # Compute rewards
+    rewards = -np.diff(np.concatenate(([0.], objective_integrand)))
+    
+    if clip:
+        rewards = np.sign(rewards)
+    
+    return list(rewards)
+
+def normalize_observations(env, observations):
+    '''Normalize the observations of a trajectory as done when using 
+    the `NormalizedObservationWrapper`. 
+    
+    Parameters
+    ----------
+    env : BoptestGymEnv
+        Environment used for the simulation
+    observations : list
+        Observations obtained in simulation
+    
+    Returns
+    -------
+    observations : list
+        Normalized observations
+    
+    '''
+    
+    wrapper = NormalizedObservationWrapper(env)
+    
+    return [wrapper.observation(obs) for obs in observations]
+    
+def make_env(envClass, wrapper=None, scenario={'electricity_price':'constant'}):
     # Use the first 3 days of February for testing with 3 days for initialization
     env = envClass(url                 = url,
                    actions             = ['oveHeaPumY_u'],
@@ -242,6 +379,12 @@ def run(envClass, wrapper=None, scenario={'electricity_price':'constant'},
     if wrapper is not None:
         env = wrapper(env)
     
+    return env
+    
+def run(envClass, wrapper=None, scenario={'electricity_price':'constant'}, 
+        plot=False):
+    env = make_env(envClass, wrapper=wrapper, scenario=scenario)
+    
     model = BaselineModel()
     # Perform test
     observations, actions, rewards, _ = test_agent(env, model, 
@@ -9,8 +9,9 @@ The BOPTEST bestest_hydrinic_heat_pump case needs to be deployed.
 from boptestGymEnv import BoptestGymEnv, NormalizedActionWrapper
 from examples.test_and_plot import test_agent
 import random
+import os
 
-url = 'http://127.0.0.1:5000'
+url = os.environ.get('BOPTEST_URL', 'http://127.0.0.1:5000')
 
 # Seed for random starting times of episodes
 random.seed(123456)
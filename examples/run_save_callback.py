@@ -13,7 +13,7 @@ from testing import utilities
 import random
 import os
 
-url = 'http://127.0.0.1:5000'
+url = os.environ.get('BOPTEST_URL', 'http://127.0.0.1:5000')
 seed = 123456
 
 # Seed for random starting times of episodes
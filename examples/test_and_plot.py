@@ -9,7 +9,6 @@ from gym.core import Wrapper
 import matplotlib.dates as mdates
 import numpy as np
 import pandas as pd
-import requests
 import json
 import os
 
@@ -78,10 +77,10 @@ def plot_results(env, rewards, points=['reaTZon_y','reaHeaPumY_y'],
         # We use env.start_time+1 to ensure that we don't return the last 
         # point from the initialization period to don't confuse it with 
         # actions taken by the agent
-        res = requests.put('{0}/results'.format(env.url), 
-                           data={'point_name':point,
-                                 'start_time':env.start_time+1, 
-                                 'final_time':3.1536e7}).json()
+        res = env.session.put('{0}/results'.format(env.url), 
+                              data={'point_name':point,
+                                    'start_time':env.start_time+1, 
+                                    'final_time':3.1536e7}).json()
         df_res = pd.concat((df_res,pd.DataFrame(data=res[point], 
                                                 index=res['time'],
                                                 columns=[point])), axis=1)
@@ -92,20 +91,20 @@ def plot_results(env, rewards, points=['reaTZon_y','reaHeaPumY_y'],
     
     # Retrieve boundary condition data. 
     # Only way we have is through the forecast request. 
-    requests.put('{0}/initialize'.format(env.url), 
-                 data={'start_time':df_res['time'].iloc[0],
-                       'warmup_period':0}).json()
+    env.session.put('{0}/initialize'.format(env.url), 
+                    data={'start_time':df_res['time'].iloc[0],
+                          'warmup_period':0}).json()
     # Store original forecast parameters
-    forecast_parameters_original = requests.get('{0}/forecast_parameters'.format(env.url)).json()
+    forecast_parameters_original = env.session.get('{0}/forecast_parameters'.format(env.url)).json()
     # Set forecast parameters for test. Take 10 points per step. 
     forecast_parameters = {'horizon':env.max_episode_length, 
                            'interval':env.step_period/10}
-    requests.put('{0}/forecast_parameters'.format(env.url),
-                 data=forecast_parameters)
-    forecast = requests.get('{0}/forecast'.format(env.url)).json()
+    env.session.put('{0}/forecast_parameters'.format(env.url),
+                    data=forecast_parameters)
+    forecast = env.session.get('{0}/forecast'.format(env.url)).json()
     # Back to original parameters, just in case we're testing during training
-    requests.put('{0}/forecast_parameters'.format(env.url),
-                 data=forecast_parameters_original)
+    env.session.put('{0}/forecast_parameters'.format(env.url),
+                    data=forecast_parameters_original)
         
     df_for = pd.DataFrame(forecast)
     df_for = reindex(df_for)
@@ -17,11 +17,10 @@ from stable_baselines.bench import Monitor
 from examples.test_and_plot import test_agent
 from collections import OrderedDict
 from testing import utilities
-import requests
 import random
 import os
 
-url = 'http://127.0.0.1:5000'
+url = os.environ.get('BOPTEST_URL', 'http://127.0.0.1:5000')
 seed = 123456
 
 # Seed for random starting times of episodes
@@ -73,9 +72,7 @@ def train_RL(algorithm           = 'SAC',
     excluding_periods.append((173*24*3600, 266*24*3600))  
     
     # Create a log directory
-    log_dir = os.path.join(utilities.get_root_path(), 'examples', 
-        'agents', '{}_{}_{:.0e}_logdir'.format(algorithm,case,training_timesteps))
-    log_dir = log_dir.replace('+', '')
+    log_dir = get_log_dir(algorithm, case, training_timesteps)
     os.makedirs(log_dir, exist_ok=True)
     
     # Redefine reward function
@@ -89,7 +86,7 @@ def train_RL(algorithm           = 'SAC',
             '''
             
             # Compute BOPTEST core kpis
-            kpis = requests.get('{0}/kpi'.format(self.url)).json()
+            kpis = self.session.get('{0}/kpi'.format(self.url)).json()
             
             # Calculate objective integrand function at this point
             objective_integrand = kpis['cost_tot'] + 10*kpis['tdis_tot']
@@ -248,6 +245,17 @@ def train_RL(algorithm           = 'SAC',
     
     return env, model, start_time_tests, log_dir
         
+def get_log_dir(algorithm, case, training_timesteps):
+    '''Get the directory where the agent of a case is logged and saved.
+    
+    '''
+    
+    log_dir = os.path.join(utilities.get_root_path(), 'examples', 
+        'agents', '{}_{}_{:.0e}_logdir'.format(algorithm,case,training_timesteps))
+    log_dir = log_dir.replace('+', '')
+    
+    return log_dir
+
 def test_peak(env, model, start_time_tests, episode_length_test, 
               warmup_period_test, log_dir=os.getcwd(), kpis_to_file=False, 
               plot=False):
@@ -8,29 +8,32 @@ the tests. Latest tests were passing with BOPTEST commit:
 
 import unittest
 import os
+import sys
+import numpy as np
 import pandas as pd
 import random
 import shutil
 from testing import utilities
 from examples import run_baseline, run_sample, run_save_callback,\
     run_variable_episode, train_RL
-from collections import OrderedDict
 from boptestGymEnv import BoptestGymEnv
 from stable_baselines.common.env_checker import check_env
 from stable_baselines import A2C
 
-url = 'http://127.0.0.1:5000'
+url = os.environ.get('BOPTEST_URL', 'http://127.0.0.1:5000')
 
 class BoptestGymEnvTest(unittest.TestCase, utilities.partialChecks):
     '''Tests the OpenAI-Gym interface for BOPTESTS.
          
     '''
  
-    def setUp(self):
-        '''Setup for each test.
+    @classmethod
+    def setUpClass(cls):
+        '''Setup for the whole test class. The environment is instantiated
+        only once since it requires a handshake with the BOPTEST server. 
          
         '''
-        self.env = BoptestGymEnv(url                 = url,
+        cls.env = BoptestGymEnv(url                 = url,
                                 actions             = ['oveHeaPumY_u'],
                                 observations        = {'reaTZon_y':(280.,310.)}, 
                                 reward              = ['reward'],
@@ -38,6 +41,46 @@ class BoptestGymEnvTest(unittest.TestCase, utilities.partialChecks):
                                 random_start_time   = True,
                                 warmup_period       = 3600,
                                 step_period         = 900)
+        cls.baseline_trajectory = None
+    
+    @classmethod
+    def tearDownClass(cls):
+        '''Close the environments of the test class to release their 
+        connections with the BOPTEST server. 
+        
+        '''
+        cls.env.close()
+        if cls.baseline_trajectory is not None:
+            cls.baseline_trajectory[-1].close()
+    
+    @classmethod
+    def get_baseline_trajectory(cls):
+        '''Run the baseline trajectory only the first time it is requested.
+        The reward and observation wrapper tests are evaluated from this 
+        same trajectory since the baseline controller does not depend on 
+        them. 
+        
+        '''
+        if cls.baseline_trajectory is None:
+            cls.baseline_trajectory = run_baseline.run_baseline_trajectory(plot=False)
+        
+        return cls.baseline_trajectory
+    
+    def setUp(self):
+        '''Setup for each test. Stores the environment attributes that 
+        are modified by some tests so that they can be restored afterwards.
+         
+        '''
+        self.env_attrs = {attr:getattr(self.env, attr) for attr in 
+                          ['random_start_time', 'start_time', 
+                           'warmup_period', 'excluding_periods']}
+    
+    def tearDown(self):
+        '''Restore the environment attributes modified by each test. 
+        
+        '''
+        for attr, value in self.env_attrs.items():
+            setattr(self.env, attr, value)
     
     def test_summary(self):
         '''
@@ -105,54 +148,73 @@ class BoptestGymEnvTest(unittest.TestCase, utilities.partialChecks):
                             (304*24*3600, 304*24*3600+14*24*3600)]
         self.env.excluding_periods = excluding_periods
         random.seed(123456)
-        start_times = OrderedDict()
+        n_resets = 100
+        start_times = np.empty(n_resets, dtype=np.int64)
+        observations = np.empty(n_resets, dtype=np.float64)
         # Reset hundred times
-        for i in range(100):
+        for i in range(n_resets):
             obs = self.env.reset()
-            start_time = self.env.start_time
-            episode = (start_time, start_time+self.env.max_episode_length)
-            for period in excluding_periods:
-                # Make sure that the episodes don't overlap with excluding_periods
-                assert not(episode[0] < period[1] and period[0] < episode[1]),\
-                        'reset is not working properly when generating random times. '\
-                        'The episode with starting time {0} and end time {1} '\
-                        'overlaps with period {2}. This corresponds to the '\
-                        'generated starting time number {3}.'\
-                        ''.format(start_time,start_time+self.env.max_episode_length,period,i)
-            start_times[start_time] = obs
+            start_times[i] = self.env.start_time
+            observations[i] = obs[0]
+        
+        # Make sure that the episodes don't overlap with excluding_periods. 
+        # Sort excluding periods by start time. An episode overlaps with any 
+        # of the periods starting before its end if and only if the latest
+        # end among these periods is after the episode start. This holds
+        # even when periods overlap or are nested with each other
+        periods = np.array(sorted(excluding_periods))
+        latest_ends = np.maximum.accumulate(periods[:,1])
+        end_times = start_times + self.env.max_episode_length
+        idx = np.searchsorted(periods[:,0], end_times) - 1
+        overlaps = (idx >= 0) & (latest_ends[np.maximum(idx,0)] > start_times)
+        i = int(np.argmax(overlaps))
+        # Report the period that overlaps with the first overlapping episode
+        overlapped = [p for p in periods if start_times[i] < p[1] and p[0] < end_times[i]]
+        assert not overlaps.any(),\
+                'reset is not working properly when generating random times. '\
+                'The episode with starting time {0} and end time {1} '\
+                'overlaps with period {2}. This corresponds to the '\
+                'generated starting time number {3}.'\
+                ''.format(start_times[i],end_times[i],tuple(overlapped[0]) if overlapped else None,i)
             
         # Check values
-        df = pd.DataFrame.from_dict(start_times, orient = 'index', columns=['value'])
-        df.index.name = 'keys'
+        df = pd.DataFrame({'value':observations}, index=pd.Index(start_times, name='keys'))
         ref_filepath = os.path.join(utilities.get_root_path(), 'testing', 'references', 'reset_random.csv')
         self.compare_ref_values_df(df, ref_filepath) 
 
     def test_compute_reward_default(self):
-        '''Test default method to compute reward.
+        '''Test default method to compute reward. Also checks that the 
+        rewards computed from the trajectory kpis match the rewards 
+        returned by the environment. 
         
         '''
-        obs, _, rew = run_baseline.run_reward_default(plot=False)
+        obs, rew, kpis, _ = self.get_baseline_trajectory()
+        self.assertTrue(np.allclose(run_baseline.compute_rewards(kpis), rew),
+                        'Rewards computed from kpis do not match the environment rewards.')
         self.check_obs_act_rew_kpi(obs=obs,act=None,rew=rew,kpi=None,label='default')
 
     def test_compute_reward_custom(self):
         '''Test custom method to compute reward.
         
         '''
-        obs, _, rew = run_baseline.run_reward_custom(plot=False)
+        obs, _, kpis, _ = self.get_baseline_trajectory()
+        rew = run_baseline.compute_rewards(kpis, w=0.1)
         self.check_obs_act_rew_kpi(obs=obs,act=None,rew=rew,kpi=None,label='custom')
         
     def test_compute_reward_clipping(self):
         '''Test reward clipping.
         
         '''
-        obs, _, rew = run_baseline.run_reward_clipping(plot=False)
+        obs, _, kpis, _ = self.get_baseline_trajectory()
+        rew = run_baseline.compute_rewards(kpis, clip=True)
         self.check_obs_act_rew_kpi(obs=obs,act=None,rew=rew,kpi=None,label='clipping')
 
     def test_normalized_observation_wrapper(self):
         '''Test wrapper that normalizes observations.
         
         '''
-        obs, _, rew = run_baseline.run_normalized_observation_wrapper(plot=False)
+        obs, rew, _, env = self.get_baseline_trajectory()
+        obs = run_baseline.normalize_observations(env, obs)
         self.check_obs_act_rew_kpi(obs=obs,act=None,rew=rew,kpi=None,label='normalizedObservationWrapper')
         
     def test_normalized_action_wrapper(self):
@@ -183,7 +245,9 @@ class BoptestGymEnvTest(unittest.TestCase, utilities.partialChecks):
             loading a pre-trained agent. Independently of whether the 
             agent is trained or not during testing, the results should be 
             exactly the same as far as the seed in `examples.train_RL` 
-            is not modified. 
+            is not modified. When `mode=load` and the environment variable
+            `BOPTEST_GYM_SKIP_PASSED` is set, the test is skipped if it 
+            already passed with the same agent, references, and source code.
         episode_length_test : integer, default=2*24*3600
             Length of the testing episode. We keep it short for testing,
             only one day is used by default. 
@@ -202,30 +266,48 @@ class BoptestGymEnvTest(unittest.TestCase, utilities.partialChecks):
         
         '''        
         
+        if expert_traj is None:
+            labels = ['{0}_{1}_{2}'.format(algorithm,case,period) for period in ['peak','typi']]
+        else:
+            labels = ['{0}_{1}_{2}_pretrained'.format(algorithm,case,period) for period in ['peak','typi']]
+        
+        # Skip the test if it already passed with the same loaded agent,
+        # references, and source code. Only applies to loaded agents.
+        if mode == 'load':
+            test_name = self.id().split('.')[-1]
+            file_paths = [os.path.join(train_RL.get_log_dir(algorithm, case, training_timesteps), 'last_model.zip')]
+            file_paths.extend([os.path.join(utilities.get_root_path(), 'testing', 'references', 
+                                            '{0}_{1}.csv'.format(kind, label)) \
+                               for label in labels for kind in ['observations','actions','rewards','kpis']])
+            file_paths.extend([os.path.join(utilities.get_root_path(), *f) for f in 
+                               [('boptestGymEnv.py',), ('examples','train_RL.py'), 
+                                ('examples','test_and_plot.py'), ('testing','utilities.py')]])
+            # This module sets the episode, warmup, and training parameters
+            file_paths.append(os.path.realpath(__file__))
+            digest = utilities.get_digest(file_paths)
+            if utilities.is_passed(test_name, digest):
+                self.skipTest('Already passed with the same agent, references, and source code.')
+        
         env, model, start_time_tests, _ = train_RL.train_RL(algorithm=algorithm,
                                                             mode=mode, 
                                                             case=case,
                                                             render=False,
                                                             training_timesteps=training_timesteps,
                                                             expert_traj=expert_traj)
+        self.addCleanup(env.close)
         
         obs, act, rew, kpi = \
             train_RL.test_peak(env, model, start_time_tests, 
                                episode_length_test, warmup_period_test, plot)
-        if expert_traj is None:
-            label = '{0}_{1}_peak'.format(algorithm,case)
-        else:
-            label = '{0}_{1}_peak_pretrained'.format(algorithm,case)
-        self.check_obs_act_rew_kpi(obs,act,rew,kpi,label)
+        self.check_obs_act_rew_kpi(obs,act,rew,kpi,labels[0])
         
         obs, act, rew, kpi = \
             train_RL.test_typi(env, model, start_time_tests, 
                                episode_length_test, warmup_period_test, plot)
-        if expert_traj is None:
-            label = '{0}_{1}_typi'.format(algorithm,case)
-        else:
-            label = '{0}_{1}_typi_pretrained'.format(algorithm,case)
-        self.check_obs_act_rew_kpi(obs,act,rew,kpi,label)
+        self.check_obs_act_rew_kpi(obs,act,rew,kpi,labels[1])
+        
+        if mode == 'load':
+            utilities.save_passed(test_name, digest)
     
     def test_A2C_simple(self):
         '''Test simple agent with only one measurement as observation and
@@ -313,6 +395,7 @@ class BoptestGymEnvTest(unittest.TestCase, utilities.partialChecks):
         # Perform a short training example with callback
         env, _, _ = run_save_callback.train_A2C_with_callback(log_dir=log_dir,
                                                               tensorboard_log=None)  
+        self.addCleanup(env.close)
         
         # Load the trained agent
         model = A2C.load(os.path.join(log_dir, 'best_model'))
@@ -349,6 +432,7 @@ class BoptestGymEnvTest(unittest.TestCase, utilities.partialChecks):
         # Perform a short training example with callback
         env, _, _ = run_variable_episode.train_A2C_with_variable_episode(log_dir=log_dir,
                                                                          tensorboard_log=None)  
+        self.addCleanup(env.close)
         
         # Load the trained agent
         model = A2C.load(os.path.join(log_dir, 'best_model'))
@@ -391,26 +475,10 @@ class BoptestGymEnvTest(unittest.TestCase, utilities.partialChecks):
         
         '''
         
-        # Check observation values
-        if obs is not None:
-            df = pd.DataFrame(obs)
-            df.index.name = 'time'
-            ref_filepath = os.path.join(utilities.get_root_path(), 'testing', 'references', 'observations_{}.csv'.format(label))
-            self.compare_ref_timeseries_df(df, ref_filepath) 
-        
-        # Check actions values
-        if act is not None:
-            df = pd.DataFrame(act)
-            df.index.name = 'time'
-            ref_filepath = os.path.join(utilities.get_root_path(), 'testing', 'references', 'actions_{}.csv'.format(label))
-            self.compare_ref_timeseries_df(df, ref_filepath) 
-        
-        # Check reward values
-        if rew is not None:
-            df = pd.DataFrame(rew)
-            df.index.name = 'time'
-            ref_filepath = os.path.join(utilities.get_root_path(), 'testing', 'references', 'rewards_{}.csv'.format(label))
-            self.compare_ref_timeseries_df(df, ref_filepath) 
+        # Check observation, action, and reward values
+        for data, kind in [(obs,'observations'), (act,'actions'), (rew,'rewards')]:
+            if data is not None:
+                self.check_timeseries(data, label, kind)
             
         if kpi is not None:
             df = pd.DataFrame(data=[kpi]).T
@@ -420,6 +488,28 @@ class BoptestGymEnvTest(unittest.TestCase, utilities.partialChecks):
             df.drop('time_rat', inplace=True) 
             ref_filepath = os.path.join(utilities.get_root_path(), 'testing', 'references', 'kpis_{}.csv'.format(label))
             self.compare_ref_values_df(df, ref_filepath)
+    
+    def check_timeseries(self, data, label='default', kind='observations'):
+        '''Auxiliary method to check a trajectory of observations, actions,
+        or rewards against its corresponding reference. 
+        
+        Parameters
+        ----------
+        data : list
+            Trajectory with one element (scalar or array) per time step.
+        label : string, default='default'
+            Label of the test case run. 
+        kind : string, default='observations'
+            Kind of trajectory, i.e. 'observations', 'actions', or 'rewards'.
+            
+        '''
+        
+        df = pd.DataFrame(np.asarray(data, dtype=np.float64))
+        df.index.name = 'time'
+        ref_filepath = os.path.join(utilities.get_root_path(), 'testing', 'references', '{0}_{1}.csv'.format(kind, label))
+        self.compare_ref_timeseries_df(df, ref_filepath) 
         
 if __name__ == '__main__':
-    utilities.run_tests(os.path.basename(__file__))
+    # Pass one or several BOPTEST urls as arguments to run the tests against
+    # them, in parallel when several urls are passed
+    utilities.run_tests(os.path.basename(__file__), urls=sys.argv[1:] or None)
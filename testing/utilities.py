@@ -8,10 +8,15 @@ utilities module that is also used within the BOPTEST repository.
 
 import os
 import unittest
+import multiprocessing
+import queue as queue_module
+import functools
+import hashlib
 import numpy as np
 import json
 import pandas as pd
 import matplotlib.pyplot as plt
+from collections import OrderedDict
 
 def get_root_path():
     '''Returns the path to the root repository directory.
@@ -38,13 +43,22 @@ def clean_up(dir_path):
         if f.endswith('.fmu') or f.endswith('.mo') or f.endswith('.txt') or f.endswith('.mat') or f.endswith('.json'):
             os.remove(os.path.join(dir_path, f))
             
-def run_tests(test_file_name):
+def run_tests(test_file_name, urls=None):
     '''Run tests and save results for specified test file.
     
     Parameters
     ----------
     test_file_name : str
         Test file name (ends in .py)
+    urls : list of str, optional
+        Urls of the deployed BOPTEST instances to be used for testing. 
+        The tests are distributed among as many worker processes as urls,
+        each of them communicating with its own BOPTEST instance through 
+        the `BOPTEST_URL` environment variable. A single url is also run 
+        in a spawned worker since the modules already imported by the 
+        calling process have read their url at import time. If None, tests
+        are run serially in this process using the default url. 
+        Default is None.
     
     '''
 
@@ -54,20 +68,275 @@ def run_tests(test_file_name):
     num_cases = suite.countTestCases()
     # Run tests
     print('\nFound {0} tests to run in {1}.\n\nRunning...'.format(num_cases, test_file_name))
-    result = unittest.TextTestRunner(verbosity = 1).run(suite);
-    # Parse and save results
-    num_failures = len(result.failures)
-    num_errors = len(result.errors)
-    num_passed = num_cases - num_errors - num_failures
-    log_json = {'TestFile':test_file_name, 'NCases':num_cases, 'NPassed':num_passed, 'NErrors':num_errors, 'NFailures':num_failures, 'Failures':{}, 'Errors':{}}
-    for i, failure in enumerate(result.failures):
-        log_json['Failures'][i]= failure[1]
-    for i, error in enumerate(result.errors):
-        log_json['Errors'][i]= error[1]
+    if urls is None:
+        result = unittest.TextTestRunner(verbosity = 1).run(suite);
+        failures = [failure[1] for failure in result.failures]
+        errors = [error[1] for error in result.errors]
+        skipped = ['{0}: {1}'.format(test.id(), reason) for test, reason in result.skipped]
+    else:
+        failures, errors, skipped = run_tests_parallel(suite, urls)
+    # Parse and save results. Skipped tests are not counted as passed
+    num_failures = len(failures)
+    num_errors = len(errors)
+    num_skipped = len(skipped)
+    num_passed = num_cases - num_errors - num_failures - num_skipped
+    log_json = {'TestFile':test_file_name, 'NCases':num_cases, 'NPassed':num_passed, 'NErrors':num_errors, 'NFailures':num_failures, 'NSkipped':num_skipped, 'Failures':{}, 'Errors':{}, 'Skipped':{}}
+    for i, failure in enumerate(failures):
+        log_json['Failures'][i]= failure
+    for i, error in enumerate(errors):
+        log_json['Errors'][i]= error
+    for i, skip in enumerate(skipped):
+        log_json['Skipped'][i]= skip
     log_file = os.path.splitext(test_file_name)[0] + '.log'
     with open(os.path.join(get_root_path(),'testing',log_file), 'w') as f:
         json.dump(log_json, f)
+
+def run_tests_parallel(suite, urls):
+    '''Distribute the test cases of a suite among worker processes, one
+    per BOPTEST url. Test cases are interleaved among workers so that the
+    expensive tests, which are discovered next to each other, are spread 
+    over all workers, while the class fixtures are still set up only once
+    per worker. 
+    
+    Parameters
+    ----------
+    suite : unittest.TestSuite
+        Test suite with the test cases to be run. 
+    urls : list of str
+        Urls of the deployed BOPTEST instances, one per worker. 
+    
+    Returns
+    -------
+    failures : list of str
+        Tracebacks of the failed test cases.
+    errors : list of str
+        Tracebacks of the test cases that raised an error.
+    skipped : list of str
+        Ids of the skipped test cases with the reason for skipping.
+    
+    '''
+    
+    # Find unique test ids keeping the order of discovery
+    test_ids = list(OrderedDict.fromkeys(get_test_ids(suite)))
+    if len(test_ids) == 0:
+        return [], [], []
+    n_workers = min(len(urls), len(test_ids))
+    chunks = [test_ids[i::n_workers] for i in range(n_workers)]
+    # Spawned workers import the test modules again and read the url at 
+    # import time, hence the environment variable is set before starting
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    workers = []
+    url_default = os.environ.get('BOPTEST_URL')
+    for i, (url, chunk) in enumerate(zip(urls, chunks)):
+        os.environ['BOPTEST_URL'] = url
+        worker = ctx.Process(target=run_tests_worker, args=(i, chunk, queue))
+        worker.start()
+        workers.append(worker)
+    if url_default is None:
+        os.environ.pop('BOPTEST_URL')
+    else:
+        os.environ['BOPTEST_URL'] = url_default
+    # Collect results. Workers that exit without reporting (e.g. killed or 
+    # crashed) are detected by polling, and all their tests are recorded 
+    # as errors. A dead worker is only given up after one more polling 
+    # period, in case its results were still on their way through the queue
+    failures = []
+    errors = []
+    skipped = []
+    pending = set(range(len(workers)))
+    dead = set()
+    while pending:
+        try:
+            i, worker_failures, worker_errors, worker_skipped = queue.get(timeout=5)
+        except queue_module.Empty:
+            for i in sorted(pending):
+                if workers[i].is_alive():
+                    continue
+                if i in dead:
+                    pending.remove(i)
+                    errors.extend(['Worker process exited with code {0} before '\
+                                   'reporting the results of {1}.'.format(workers[i].exitcode, test_id) \
+                                   for test_id in chunks[i]])
+                    print('\nWorker {0} exited with code {1} without reporting results.'.format(i, workers[i].exitcode))
+                else:
+                    dead.add(i)
+            continue
+        pending.discard(i)
+        failures.extend(worker_failures)
+        errors.extend(worker_errors)
+        skipped.extend(worker_skipped)
+        print('\nFinished {0} of {1} workers.'.format(len(workers)-len(pending), len(workers)))
+    for worker in workers:
+        worker.join()
+    
+    return failures, errors, skipped
+
+def run_tests_worker(worker_id, test_ids, queue):
+    '''Run the test cases with the specified ids and put their failures,
+    errors, and skipped tests in the queue. 
+    
+    Parameters
+    ----------
+    worker_id : int
+        Index of the worker, used to identify its results in the queue.
+    test_ids : list of str
+        Ids of the test cases to be run. 
+    queue : multiprocessing.Queue
+        Queue where the tracebacks of failures and errors, and the skipped
+        tests are put. 
+    
+    '''
+    
+    suite = unittest.TestLoader().loadTestsFromNames(test_ids)
+    result = unittest.TextTestRunner(verbosity = 1).run(suite)
+    queue.put((worker_id,
+               [failure[1] for failure in result.failures],
+               [error[1] for error in result.errors],
+               ['{0}: {1}'.format(test.id(), reason) for test, reason in result.skipped]))
+
+def get_test_ids(suite):
+    '''Get the ids of all test cases within a (possibly nested) suite.
+    
+    Parameters
+    ----------
+    suite : unittest.TestSuite
+        Test suite.
+    
+    Returns
+    -------
+    test_ids : list of str
+        Ids of the test cases in the suite. 
+    
+    '''
+    
+    test_ids = []
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            test_ids.extend(get_test_ids(test))
+        else:
+            test_ids.append(test.id())
+    
+    return test_ids
         
+def load_ref(ref_filepath, index_col):
+    '''Load a reference csv into a pandas DataFrame. References are 
+    cached by file path and modification time, so that each reference 
+    is parsed only once unless it changes on disk. 
+    
+    Parameters
+    ----------
+    ref_filepath : str
+        Reference file path.
+    index_col : str
+        Name of the column used as index, i.e. "time" for timeseries 
+        references and "keys" for values references.
+    
+    Returns
+    -------
+    df_ref : pandas DataFrame
+        Copy of the cached reference dataframe. 
+    
+    '''
+    
+    df_ref = _read_ref(ref_filepath, os.path.getmtime(ref_filepath), index_col)
+    
+    return df_ref.copy()
+
+@functools.lru_cache(maxsize=None)
+def _read_ref(ref_filepath, mtime, index_col):
+    '''Parse a reference csv with typed columns. The modification time
+    is only used as part of the cache key. 
+    
+    '''
+    
+    if index_col == 'keys':
+        dtype = {'value':np.float64}
+    else:
+        dtype = np.float64
+    
+    return pd.read_csv(ref_filepath, index_col=index_col, dtype=dtype, engine='c')
+
+def get_digest(file_paths):
+    '''Get a digest of the content of a set of files. Files that do not
+    exist only contribute with their path to the digest. 
+    
+    Parameters
+    ----------
+    file_paths : list of str
+        Paths of the files to be hashed.
+    
+    Returns
+    -------
+    digest : str
+        Hexadecimal digest of the files.
+    
+    '''
+    
+    h = hashlib.sha256()
+    for file_path in file_paths:
+        h.update(os.path.relpath(file_path, get_root_path()).encode())
+        if os.path.exists(file_path):
+            with open(file_path, 'rb') as f:
+                h.update(f.read())
+    
+    return h.hexdigest()
+
+def get_passed_filepath(test_name):
+    '''Get the path of the file storing the digest of the last pass of 
+    a test. 
+    
+    '''
+    
+    return os.path.join(get_root_path(), 'testing', '.cache', 'passed', 
+                        '{}.hash'.format(test_name))
+
+def is_passed(test_name, digest):
+    '''Check whether a test already passed with the same digest. Only
+    enabled when the `BOPTEST_GYM_SKIP_PASSED` environment variable is set,
+    since the digest does not account for the BOPTEST version deployed.
+    
+    Parameters
+    ----------
+    test_name : str
+        Name of the test.
+    digest : str
+        Digest of the files that determine the test result.
+    
+    Returns
+    -------
+    passed : bool
+        True if skipping is enabled and the stored digest matches.
+    
+    '''
+    
+    passed_filepath = get_passed_filepath(test_name)
+    if not os.environ.get('BOPTEST_GYM_SKIP_PASSED') or \
+        not os.path.exists(passed_filepath):
+        return False
+    with open(passed_filepath, 'r') as f:
+        passed = f.read().strip() == digest
+    
+    return passed
+
+def save_passed(test_name, digest):
+    '''Store the digest of the files that determine the result of a test
+    that has just passed. 
+    
+    Parameters
+    ----------
+    test_name : str
+        Name of the test.
+    digest : str
+        Digest of the files that determine the test result.
+    
+    '''
+    
+    passed_filepath = get_passed_filepath(test_name)
+    os.makedirs(os.path.dirname(passed_filepath), exist_ok=True)
+    with open(passed_filepath, 'w') as f:
+        f.write(digest)
+
 def compare_references(vars_timeseries = ['reaTRoo_y'],
                        refs_old = 'references_old',
                        refs_new = 'references'):
@@ -164,7 +433,7 @@ class partialChecks(object):
         # Perform test
         if os.path.exists(ref_filepath):
             # If reference exists, check it
-            df_ref = pd.read_csv(ref_filepath, index_col='time')   
+            df_ref = load_ref(ref_filepath, index_col='time')
             # Ensure that both, df and df_ref have strings as keys
             df.columns      = [str(c) for c in df.columns.to_list()]
             df_ref.columns  = [str(c) for c in df_ref.columns.to_list()]
@@ -237,12 +506,26 @@ class partialChecks(object):
         # Perform test
         if os.path.exists(ref_filepath):
             # If reference exists, check it
-            df_ref = pd.read_csv(ref_filepath, index_col='keys')           
-            for key in df.index.values:
-                y_test = [df.loc[key,'value']]
-                y_ref = [df_ref.loc[key,'value']]
+            df_ref = load_ref(ref_filepath, index_col='keys')
+            # Check all keys in test are in reference
+            for key in df.index.to_list():
+                self.assertTrue(key in df_ref.index, 'Test key {0} not in reference data.'.format(key))
+            if pd.api.types.is_numeric_dtype(df['value']):
+                # Check all numeric values at once
+                y_test = df['value'].to_numpy(dtype=np.float64)
+                y_ref = df_ref.loc[df.index, 'value'].to_numpy(dtype=np.float64)
                 results = self.check_trajectory(y_test, y_ref)
+                if not results['Pass'] and results['IndexMax'] is not None:
+                    key = df.index[results['IndexMax']]
+                else:
+                    key = None
                 self.assertTrue(results['Pass'], '{0} Key is {1}.'.format(results['Message'],key))
+            else:
+                for key in df.index.values:
+                    y_test = [df.loc[key,'value']]
+                    y_ref = [df_ref.loc[key,'value']]
+                    results = self.check_trajectory(y_test, y_ref)
+                    self.assertTrue(results['Pass'], '{0} Key is {1}.'.format(results['Message'],key))
         else:
             # Otherwise, save as reference
             df.to_csv(ref_filepath)
@@ -283,30 +566,28 @@ class partialChecks(object):
             result['Pass'] = False
             result['Message'] = 'Test and reference trajectory not the same length.'
         else:
-            # Initialize error arrays
-            err_abs = np.zeros(len(y_ref))
-            err_rel = np.zeros(len(y_ref))
-            err_fun = np.zeros(len(y_ref))
             # Calculate errors
-            for i in range(len(y_ref)):
-                # Absolute error
-                err_abs[i] = np.absolute(y_test[i] - y_ref[i])
-                # Relative error
-                if (abs(y_ref[i]) > 10 * tol):
-                    err_rel[i] = err_abs[i] / abs(y_ref[i])
-                else:
-                    err_rel[i] = 0
-                # Total error
-                err_fun[i] = err_abs[i] + err_rel[i]
-                # Assess error
-                err_max = max(err_fun);
-                i_max = np.argmax(err_fun);
+            y_test = np.asarray(y_test, dtype=np.float64)
+            y_ref = np.asarray(y_ref, dtype=np.float64)
+            # Absolute error
+            err_abs = np.absolute(y_test - y_ref)
+            # Relative error, only where the reference is not close to zero
+            y_ref_abs = np.absolute(y_ref)
+            is_rel = y_ref_abs > 10 * tol
+            err_rel = np.zeros(len(y_ref))
+            err_rel[is_rel] = err_abs[is_rel] / y_ref_abs[is_rel]
+            # Total error. Missing values are considered as a failed check
+            err_fun = err_abs + err_rel
+            err_fun[np.isnan(err_fun)] = np.inf
+            # Assess error
+            if len(err_fun) > 0:
+                i_max = int(np.argmax(err_fun))
+                err_max = err_fun[i_max]
                 if err_max > tol:
                     result['Pass'] = False
-                    result['ErrorMax'] = err_max,
-                    result['IndexMax'] = i_max,
-                    result['Message'] = 'Max error ({0}) in trajectory greater than tolerance ({1}) at index {2}. y_test: {3}, y_ref:{4}'.format(err_max, tol, i_max, y_test[i_max], y_ref[i_max])
-        
+                    result['ErrorMax'] = err_max
+                    result['IndexMax'] = i_max
+                    result['Message'] = 'Max error ({0}) in trajectory greater than tolerance ({1}) at index {2}. y_test: {3}, y_ref:{4}'.format(err_max, tol, i_max, y_test[i_max], y_ref[i_max])        
         return result
     
     def create_test_points(self, s,n=500):